@@ -1,118 +1,155 @@
 import dash
 import pandas as pd
-from dash import dcc, html
+from dash import dcc, html, Input, Output
+from flask_caching import Cache
 import plotly.express as px
+import plotly.io as pio
+import json
 import os
 
 # configuration
-DATA_FILE = 'pink_morsel_sales_summary.csv' 
+DATA_FILE = 'pink_morsel_daily_sales.parquet'
+META_FILE = 'pink_morsel_sales_summary.meta.json'
 DEFAULT_CURRENCY_SYMBOL = '$'
+CACHE_CONFIG = {'CACHE_TYPE': 'FileSystemCache', 'CACHE_DIR': '.cache'}
+CACHE_TIMEOUT = 3600 # seconds
 
-# data loading and cleaning
-def load_and_clean_data(file_path):
+# data loading
+def load_and_clean_data(file_path, meta_path=META_FILE):
     """
-    Loads the sales summary CSV, detects the currency symbol,
-    cleans the 'sales' column into a numeric format, and prepares the DataFrame.
+    Loads the daily sales Parquet file written by task_two_clean_data.py and
+    reads the currency symbol from its JSON sidecar. 'sales' is already summed
+    per date and region and 'date' is already datetime64, so no cleaning or
+    aggregation is needed here.
     """
     if not os.path.exists(file_path):
-        print(f"Error: Data file not found at {file_path}. Please run 'process_sales_data.py' first.")
+        print(f"Error: Data file not found at {file_path}. Please run 'task_two_clean_data.py' first.")
         # return an empty DataFrame to prevent app crash
         return pd.DataFrame({'sales': [], 'date': [], 'region': []}), DEFAULT_CURRENCY_SYMBOL
 
-    df = pd.read_csv(file_path)
+    df = pd.read_parquet(file_path)
 
     if df.empty:
         print("Warning: Data file is empty.")
         return pd.DataFrame({'sales': [], 'date': [], 'region': []}), DEFAULT_CURRENCY_SYMBOL
 
-    # get the first sales string value to detect the symbol
-    first_sales_value = df['sales'].astype(str).dropna().iloc[0] if not df['sales'].dropna().empty else None
-    
-    if first_sales_value and len(first_sales_value) > 1:
-        currency_symbol = first_sales_value[0]
-        slice_start_index = 1
-    else:
-        # fallback to default symbol and no slicing
-        currency_symbol = DEFAULT_CURRENCY_SYMBOL
-        slice_start_index = 0
-
-    # clean 'sales' column (convert string back to numeric float)
-    df['Sales_Value'] = (
-        df['sales']
-        .astype(str)
-        .str.slice(slice_start_index)
+    # read the currency symbol saved alongside the data (fallback to default symbol)
+    currency_symbol = DEFAULT_CURRENCY_SYMBOL
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            currency_symbol = json.load(f).get('currency_symbol', DEFAULT_CURRENCY_SYMBOL)
+
+    return df, currency_symbol
+
+# shared cache, so the data is loaded and the figure built once for all workers
+# (bound to the Flask server in create_app)
+cache = Cache()
+
+# figure construction
+def build_figure(file_path):
+    """
+    Loads the daily sales data and builds the Plotly line chart.
+    """
+    # load the (already aggregated) data
+    daily_sales, currency_symbol = load_and_clean_data(file_path)
+
+    # create the Plotly Line Chart
+    fig = px.line(
+        daily_sales, 
+        x='date', 
+        y='sales', 
+        color='region', 
+        title=f'Pink Morsel Total Daily Sales by Region',
+        labels={
+            'date': 'Date',
+            'sales': f'Total Sales ({currency_symbol})',
+            'region': 'Region'
+        },
+        template='plotly_white',
+        # WebGL (scattergl) traces render long time series on the GPU instead of as SVG paths
+        render_mode='webgl'
     )
-    df['Sales_Value'] = pd.to_numeric(df['Sales_Value'], errors='coerce').fillna(0)
 
-    # ensure 'date' is a datetime object for proper visualization on the X-axis
-    df['date'] = pd.to_datetime(df['date'])
+    # customize layout for better readability
+    fig.update_layout(
+        xaxis_title='Date',
+        yaxis_title=f'Total Sales ({currency_symbol})',
+        xaxis={'tickformat': '%Y-%m-%d'}, # Explicit date format
+        # currency formatting happens in the browser; the data itself stays numeric
+        yaxis={'tickprefix': currency_symbol, 'tickformat': ',.2f', 'hoverformat': ',.2f'},
+        margin=dict(l=40, r=40, t=60, b=40),
+        transition_duration=500
+    )
 
-    return df, currency_symbol
+    return fig
+
+@cache.memoize(timeout=CACHE_TIMEOUT)
+def get_figure_json(file_path, data_mtime):
+    """
+    Returns the line chart serialized as JSON, built once per data file version.
+    'data_mtime' is only part of the cache key, so regenerating the data file
+    invalidates the cached figure.
+    """
+    # serialize the figure once; the callback then returns a plain dict that Dash can
+    # send as-is instead of converting the Figure object on every request
+    return pio.to_json(build_figure(file_path), validate=False)
+
+# app layout (HTML only; the figure is fetched by the callback below once the page has rendered)
+def serve_layout():
+    return html.Div(
+        style={
+            'fontFamily': 'Arial, sans-serif',
+            'maxWidth': '1200px',
+            'margin': '0 auto',
+            'padding': '20px'
+        },
+        children=[
+            html.H1(
+                "Pink Morsel Sales Analysis Dashboard", 
+                style={'textAlign': 'center', 'color': '#333'}
+            ),
+            html.Div(
+                [
+                    html.P(
+                        f"Data Source: {DATA_FILE}",
+                        style={'textAlign': 'center', 'color': '#666'}
+                    ),
+                ],
+                style={'marginBottom': '20px', 'borderBottom': '1px solid #ddd', 'paddingBottom': '10px'}
+            ),
+            dcc.Graph(
+                id='sales-line-chart',
+                figure={},
+                style={'height': '600px'}
+            ),
+            # fires once, right after the page is rendered, to load the figure
+            dcc.Interval(id='sales-chart-loader', interval=1, max_intervals=1)
+        ]
+    )
+
+# callback that fills in the figure once the page has rendered (registered in create_app)
+def load_figure(n_intervals):
+    data_mtime = os.path.getmtime(DATA_FILE) if os.path.exists(DATA_FILE) else None
+    return json.loads(get_figure_json(DATA_FILE, data_mtime))
+
+# dash App Setup (a factory, so importing this module does no work)
+def create_app():
+    """
+    Creates the Dash app, binds the shared cache and registers the layout and callbacks.
+    """
+    app = dash.Dash(__name__)
+    cache.init_app(app.server, config=CACHE_CONFIG)
+
+    app.layout = serve_layout
+    app.callback(
+        Output('sales-line-chart', 'figure'),
+        Input('sales-chart-loader', 'n_intervals'),
+        prevent_initial_call=True
+    )(load_figure)
 
-# load the data once
-df, currency_symbol = load_and_clean_data(DATA_FILE)
-
-# data Aggregation for Line Chart
-daily_sales = df.groupby(['date', 'region'])['Sales_Value'].sum().reset_index()
-daily_sales.rename(columns={'Sales_Value': 'Total Daily Sales'}, inplace=True)
-
-# dash App Setup
-app = dash.Dash(__name__)
-
-# create the Plotly Line Chart
-fig = px.line(
-    daily_sales, 
-    x='date', 
-    y='Total Daily Sales', 
-    color='region', 
-    title=f'Pink Morsel Total Daily Sales by Region',
-    labels={
-        'date': 'Date',
-        'Total Daily Sales': f'Total Sales ({currency_symbol})',
-        'region': 'Region'
-    },
-    template='plotly_white'
-)
-
-# customize layout for better readability
-fig.update_layout(
-    xaxis_title='Date',
-    yaxis_title=f'Total Sales ({currency_symbol})',
-    xaxis={'tickformat': '%Y-%m-%d'}, # Explicit date format
-    margin=dict(l=40, r=40, t=60, b=40),
-    transition_duration=500
-)
-
-# app layout
-app.layout = html.Div(
-    style={
-        'fontFamily': 'Arial, sans-serif',
-        'maxWidth': '1200px',
-        'margin': '0 auto',
-        'padding': '20px'
-    },
-    children=[
-        html.H1(
-            "Pink Morsel Sales Analysis Dashboard", 
-            style={'textAlign': 'center', 'color': '#333'}
-        ),
-        html.Div(
-            [
-                html.P(
-                    f"Data Source: {DATA_FILE}",
-                    style={'textAlign': 'center', 'color': '#666'}
-                ),
-            ],
-            style={'marginBottom': '20px', 'borderBottom': '1px solid #ddd', 'paddingBottom': '10px'}
-        ),
-        dcc.Graph(
-            id='sales-line-chart',
-            figure=fig,
-            style={'height': '600px'}
-        )
-    ]
-)
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
     # setting debug=True allows for automatic reloading on code changes
     app.run(debug=True)
\ No newline at end of file
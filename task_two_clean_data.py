@@ -1,9 +1,41 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import os
-import glob
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import json
 import yaml
 import sys 
 
+# Splits a raw price string such as '$3.00' into an optional currency symbol and its numeric part.
+# The symbol can never be a digit, '.' or '-' (so '-2.50' keeps its sign), and only well-formed
+# numbers match the value, so malformed prices like '1.2.3' are rejected rather than failing the cast
+PRICE_PATTERN = r'^(?P<sym>[^\d.\-]?)(?P<val>-?\d+(?:\.\d+)?)$'
+
+# Only these columns are needed from the matching rows of the raw CSV files
+SALES_COLUMNS = ['price', 'quantity', 'date', 'region']
+
+# Explicit column types for the CSV reader, so a file is never typed from a guess on its first block
+# (prices stay as their original text, and all-empty quantity/region columns still read correctly)
+CSV_COLUMN_TYPES = {
+    'price': pa.string(),
+    'quantity': pa.float64(),
+    'region': pa.string(),
+    'date': pa.timestamp('s')
+}
+
+# Arrow schema of the cleaned summary rows, fixed so every chunk and file writes the same column types
+SUMMARY_SCHEMA = pa.schema([
+    ('sales', pa.float64()),
+    ('date', pa.timestamp('s')),
+    ('region', pa.dictionary(pa.int32(), pa.string()))
+])
+
 # --- CONFIGURATION LOADING ---
 def load_config(config_path='task_two_config.yaml'):
     """
@@ -25,31 +57,137 @@ def load_config(config_path='task_two_config.yaml'):
         print(f"Error parsing YAML file: {e}")
         sys.exit(1)
 
+# --- CHUNK CLEANING ---
+def clean_sales_chunk(batch):
+    """
+    Cleans one Arrow record batch of matching sales rows: splits the price into its
+    currency symbol and numeric value and calculates sales.
+    Returns the summary rows ('sales', 'date', 'region') and the first currency symbol
+    detected in the chunk (None if the prices carry no symbol).
+    """
+    # 1. SYMBOL DETECTION & CLEAN PRICE: one regex pass yields both the symbol and the numeric part
+    # Runs as an Arrow compute kernel on the Arrow column, so no Python string is created per cell
+    price_parts = pc.extract_regex(batch.column('price'), PRICE_PATTERN)
+
+    detected_symbols = pc.drop_null(pc.struct_field(price_parts, 'sym'))
+    detected_symbols = pc.filter(detected_symbols, pc.not_equal(detected_symbols, ''))
+    chunk_symbol = detected_symbols[0].as_py() if len(detected_symbols) > 0 else None
+
+    # Prices that do not match the pattern (missing or malformed) become 0
+    price_numeric = pc.cast(pc.struct_field(price_parts, 'val'), pa.float64()).fill_null(0.0)
+
+    # 2. Calculate Sales as price * quantity in a single float64 multiply
+    quantity = batch.column('quantity').fill_null(0).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+    sales_numeric = price_numeric.to_numpy(zero_copy_only=False) * quantity
+
+    # 3. Build the three output columns directly (the wide batch is never copied into pandas)
+    # 'region' is low-cardinality, so store it as a category (integer codes for groupby, dictionary-encoded in Parquet)
+    # 'date' was already parsed by the CSV reader and is stored as datetime64 so the dashboard can load it as-is
+    summary_df = pd.DataFrame({
+        'sales': sales_numeric,
+        'date': batch.column('date').to_numpy(zero_copy_only=False),
+        'region': batch.column('region').dictionary_encode().to_pandas()
+    })
+
+    return summary_df, chunk_symbol
+
+def combine_daily_sales(daily_sales_df, chunk_daily_df):
+    """
+    Folds a chunk's daily sales per region into the running totals (None when there are none yet).
+    """
+    if daily_sales_df is None:
+        return chunk_daily_df
+    combined_df = pd.concat([daily_sales_df, chunk_daily_df], ignore_index=True)
+    return combined_df.groupby(['date', 'region'], as_index=False, observed=True)['sales'].sum()
+
+# --- PER-FILE PROCESSING (runs in a worker process) ---
+def process_sales_file(file_path, part_file, product_filter, chunk_size, date_format):
+    """
+    Streams one CSV file in chunks, keeping only the rows for product_filter, and writes
+    the cleaned rows chunk by chunk to the Parquet part_file.
+    Dates are parsed by the CSV reader itself using the fixed date_format.
+    Returns the number of rows written (0 if none, in which case no part file is created),
+    their daily sales per region, and the first currency symbol detected in the file.
+    """
+    total_records = 0
+    daily_sales_df = None
+    currency_symbol = None
+    writer = None
+
+    # 1. Push the product filter into the reader, so only matching rows (and only the
+    #    columns we use) are materialized, one chunk at a time
+    # Blank cells become nulls (so a blank region is not plotted as a "" region)
+    csv_format = ds.CsvFileFormat(convert_options=pa_csv.ConvertOptions(
+        column_types=CSV_COLUMN_TYPES,
+        timestamp_parsers=[date_format],
+        strings_can_be_null=True
+    ))
+    scanner = ds.dataset(file_path, format=csv_format).scanner(
+        filter=ds.field('product') == product_filter,
+        columns=SALES_COLUMNS,
+        batch_size=chunk_size
+    )
+
+    try:
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+
+            # 2. Clean the chunk and keep the first currency symbol we come across
+            summary_df, chunk_symbol = clean_sales_chunk(batch)
+            if currency_symbol is None:
+                currency_symbol = chunk_symbol
+
+            # 3. Append the cleaned rows to this file's part (only one chunk is ever held in memory)
+            summary_table = pa.Table.from_pandas(summary_df, schema=SUMMARY_SCHEMA, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(part_file, summary_table.schema)
+            writer.write_table(summary_table)
+            total_records += summary_table.num_rows
+
+            # 4. Early aggregation: fold this chunk's daily sales per region into the running totals
+            chunk_daily_df = summary_df.groupby(['date', 'region'], as_index=False, observed=True)['sales'].sum()
+            daily_sales_df = combine_daily_sales(daily_sales_df, chunk_daily_df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return total_records, daily_sales_df, currency_symbol
+
 # --- CORE PROCESSING LOGIC ---
 def process_sales_data(config):
     """
     Parses all CSV files in the configured data directory, filters by product,
-    calculates sales, and saves the summary to the output_file with currency symbols re-attached.
+    calculates sales, and saves the summary as Parquet (numeric 'sales', typed 'date')
+    with the detected currency symbol stored in a JSON sidecar file. Daily sales per
+    region are also pre-aggregated and saved for the dashboard.
+    Files are processed in parallel worker processes, each streaming its rows in chunks
+    of at most 'chunk_size' into a temporary Parquet part file. The parts are then
+    copied into the summary chunk by chunk, so peak memory is bounded by the chunk size
+    (plus the small per-file daily totals) rather than the size of the input files.
     """
     # Extract parameters from the loaded configuration
     data_dir = config.get('data_directory', 'data')
     product_filter = config.get('product_filter', 'pink morsel')
     default_symbol = config.get('default_currency_symbol', '$')
+    chunk_size = config.get('chunk_size', 500_000)
+    date_format = config.get('date_format', '%Y-%m-%d')
     
-    # Generate the output filename dynamically
-    output_file = f"{product_filter.replace(' ', '_').lower()}_sales_summary.csv"
+    # Generate the output filenames dynamically
+    product_slug = product_filter.replace(' ', '_').lower()
+    output_file = f"{product_slug}_sales_summary.parquet"
+    daily_file = f"{product_slug}_daily_sales.parquet"
+    meta_file = f"{product_slug}_sales_summary.meta.json"
 
     print(f"\nStarting data processing for product '{product_filter}' from directory: {data_dir}...")
     print(f"Check README and config file 'task_two_config.yaml' for more info")
     
 
-    all_filtered_data = []
-    
-    # currency_symbol will hold the symbol used for final output (first detected symbol or default)
-    currency_symbol = None 
-    
-    # Find all CSV files in the configured directory
-    csv_files = glob.glob(os.path.join(data_dir, '*.csv'))
+    # Find all CSV files in the configured directory (sorted, so file order and the detected symbol are deterministic)
+    csv_files = sorted(
+        entry.path for entry in os.scandir(data_dir)
+        if entry.is_file() and entry.name.endswith('.csv')
+    ) if os.path.isdir(data_dir) else []
 
     if not csv_files:
         if not os.path.exists(data_dir):
@@ -58,102 +196,96 @@ def process_sales_data(config):
             print(f"Error: No CSV files found in {data_dir}. Please check your 'data_directory' setting in task_two_config.yaml.")
         return
 
-    for file_path in csv_files:
+    # currency_symbol holds the symbol used for final output (first detected symbol or default)
+    currency_symbol = None
+    daily_sales_df = None
+    total_records = 0
+    writer = None
+
+    # 1. Process the files in parallel; each worker writes its cleaned rows to its own part file
+    #    and returns only the row count, its daily totals and its currency symbol
+    with tempfile.TemporaryDirectory() as parts_dir, ProcessPoolExecutor() as executor:
+        futures = []
+        for index, file_path in enumerate(csv_files):
+            part_file = os.path.join(parts_dir, f"part_{index}.parquet")
+            # Empty files have no header for the CSV reader to work with, so they are never submitted
+            future = None
+            if not (os.path.isfile(file_path) and os.path.getsize(file_path) == 0):
+                future = executor.submit(process_sales_file, file_path, part_file, product_filter, chunk_size, date_format)
+            futures.append((file_path, part_file, future))
+
         try:
-            print(f"Processing {file_path}...")
-            df = pd.read_csv(file_path)
+            # 2. Collect the results in file order
+            for file_path, part_file, future in futures:
+                print(f"Processing {file_path}...")
+                if future is None:
+                    print(f"   -> Skipping empty file: {file_path}")
+                    continue
 
-            # 1. Filter using the configured product name (most efficient place)
-            pink_morsel_df = df[df['product'] == product_filter].copy()
+                try:
+                    file_records, file_daily_df, file_symbol = future.result()
+                except FileNotFoundError:
+                    print(f"   -> File not found: {file_path}")
+                    continue
+                except Exception as e:
+                    # Provide verbose error logging for better debugging
+                    print(f"   -> Error processing file {file_path} for product '{product_filter}': {e}. Check data integrity.")
+                    continue
 
-            if pink_morsel_df.empty:
-                print(f"   -> No '{product_filter}' entries in this file. Skipping.")
-                continue
+                if file_records == 0:
+                    print(f"   -> No '{product_filter}' entries in this file. Skipping.")
+                    continue
 
-            # --- DATA CLEANING & CONVERSION ---
-            
-            # Initialize flags
-            slice_start_index = 0
-            
-            # 2. SYMBOL DETECTION & SLICING CONTROL (only executes on the first file with data)
-            if currency_symbol is None:
-                first_price_string = pink_morsel_df['price'].dropna().iloc[0] if not pink_morsel_df['price'].dropna().empty else None
-                
-                if first_price_string and len(first_price_string) > 0:
-                    # Symbol found, set it and prepare to slice
-                    currency_symbol = first_price_string[0]
-                    slice_start_index = 1
-                else:
-                    # No price data found in this file's pink morsel entries, use default and don't slice
-                    currency_symbol = default_symbol
-                    slice_start_index = 0
-            else:
-                # After the first file, we assume the format is consistent with the detected symbol (or lack thereof)
-                # If we detected a symbol earlier, we need to slice now.
-                if currency_symbol != default_symbol:
-                    slice_start_index = 1
-                # If currency_symbol == default_symbol, it means we didn't find a symbol in the first relevant file, so we keep slice_start_index = 0
-            
-            # 3. CLEAN PRICE: Use the determined slice_start_index for the current DataFrame.
-            pink_morsel_df['price_clean_str'] = (
-                pink_morsel_df['price']
-                .astype(str)
-                .str.slice(slice_start_index) 
-            )
-            
-            # 4. Convert price to CENTS using reusable variables
-            # Convert to numeric (errors='coerce' handles non-price data gracefully)
-            price_numeric = pd.to_numeric(pink_morsel_df['price_clean_str'], errors='coerce').fillna(0)
-            price_cents = (price_numeric * 100).astype(int)
-
-            # 5. Calculate Sales in CENTS (Exact Integer Arithmetic)
-            quantity = pink_morsel_df['quantity'].fillna(0)
-            sales_cents = price_cents * quantity
-            
-            # 6. Convert final sales figure back to Dollars (float format for internal use)
-            sales_numeric = sales_cents / 100.0
-            
-            # -------------------------------------------------------------------------
-
-            # 7. Select and rename required columns
-            summary_df = pink_morsel_df.assign(
-                sales=sales_numeric
-            )[['sales', 'date', 'region']]
-
-            all_filtered_data.append(summary_df)
-
-        except pd.errors.EmptyDataError:
-            print(f"   -> Skipping empty file: {file_path}")
-        except FileNotFoundError:
-            print(f"   -> File not found: {file_path}")
-        except Exception as e:
-            # Provide verbose error logging for better debugging
-            print(f"   -> Error processing file {file_path} for product '{product_filter}': {e}. Check data integrity.")
-            continue
-
-    if not all_filtered_data:
+                # 3. Copy the part into the summary file chunk by chunk (Parquet keeps the column types, no re-parsing needed)
+                try:
+                    part = pq.ParquetFile(part_file)
+                    # check the schema up front, so a mismatching file never leaves partial rows in the summary
+                    if writer is not None and not part.schema_arrow.equals(writer.schema, check_metadata=False):
+                        raise ValueError(f"cleaned columns {part.schema_arrow.types} do not match {writer.schema.types}")
+                    for part_batch in part.iter_batches(batch_size=chunk_size):
+                        part_table = pa.Table.from_batches([part_batch])
+                        if writer is None:
+                            writer = pq.ParquetWriter(output_file, part_table.schema)
+                        writer.write_table(part_table)
+                except Exception as e:
+                    # Provide verbose error logging for better debugging
+                    print(f"   -> Error processing file {file_path} for product '{product_filter}': {e}. Check data integrity.")
+                    continue
+                total_records += file_records
+
+                # 4. Keep the first currency symbol detected (files are visited in order)
+                if currency_symbol is None:
+                    currency_symbol = file_symbol
+
+                # 5. Fold this file's daily sales per region into the running totals
+                daily_sales_df = combine_daily_sales(daily_sales_df, file_daily_df)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    if total_records == 0:
         print("\n--- Processing Complete ---")
         print(f"No '{product_filter}' data was successfully extracted from any file.")
         return
 
-    final_summary_df = pd.concat(all_filtered_data, ignore_index=True)
-    
-    # --- FORMATTING ---
-    
-    # Ensure currency_symbol is not None (should only be None if all files were empty)
+    # --- OUTPUT ---
+
     if currency_symbol is None:
-        currency_symbol = default_symbol 
+        currency_symbol = default_symbol
 
-    # Format the numeric 'sales' column back into a currency string for reporting
-    final_summary_df['sales'] = final_summary_df['sales'].apply(
-        lambda x: f"{currency_symbol}{x:.2f}"
-    )
+    # Save the daily sales per region so the dashboard can plot them without a groupby
+    daily_sales_df = daily_sales_df.sort_values(['date', 'region'], ignore_index=True)
+    daily_sales_df['region'] = daily_sales_df['region'].astype('category')
+    daily_sales_df.to_parquet(daily_file, index=False)
+
+    # Save the currency symbol separately instead of re-attaching it to every value
+    with open(meta_file, 'w') as f:
+        json.dump({'currency_symbol': currency_symbol}, f)
 
-    # Save the final DataFrame
-    final_summary_df.to_csv(output_file, index=False)
     print(f"\n--- Processing Complete ---")
-    print(f"Total '{product_filter}' sales records found: {len(final_summary_df)}")
-    print(f"Results saved to: {output_file}")
+    print(f"Total '{product_filter}' sales records found: {total_records}")
+    print(f"Results saved to: {output_file} (metadata: {meta_file})")
+    print(f"Daily sales by region saved to: {daily_file}")
 
 # --- EXECUTION ---
 if __name__ == '__main__':